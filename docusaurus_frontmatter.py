@@ -1,9 +1,18 @@
 import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import mmap
 import os
+import random
 import sys
 import re
+import shutil
+import tempfile
 import time
 import warnings
+from multiprocessing import Pool
 os.environ['GRPC_VERBOSITY'] = 'NONE'
 # Silence proto shadowing warnings emitted during google-genai imports.
 warnings.filterwarnings(
@@ -12,161 +21,751 @@ warnings.filterwarnings(
     category=UserWarning,
 )
 import yaml
+try:
+    # Prefer the libyaml-backed C implementations when PyYAML was built with them.
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 from google import genai
-from google.api_core import exceptions as google_exceptions
+from google.genai import errors as genai_errors
+from google.genai import types
 from dotenv import load_dotenv
 
-def generate_front_matter(content, model_name):
+import fm_cache
+
+# Separates a leading YAML front matter block from the rest of the file. Only used
+# as a fallback for fences with trailing whitespace.
+_FM_RE = re.compile(r'^---\s*\n(.*?)\n---\s*\n(.*)', re.DOTALL)
+# Matches the blank lines between the closing fence and the main content.
+_BLANK_LINES_RE = re.compile(r'(?:[ \t\r\f\v]*\n)*')
+# Matches a closing fence with trailing whitespace, which the fast path would miss.
+_LOOSE_FENCE_RE = re.compile(r'\n---[ \t\r\f\v]+\n')
+
+# Prompt text placed before and after the page content.
+_PROMPT_HEAD = """\
+Analyze the following Markdown formatted page content and generate a concise, SEO-friendly description and a list of relevant keywords.
+
+**Markdown Content:**
+```markdown
+"""
+_PROMPT_TAIL = """
+```
+
+**Instructions:**
+1.  **Description:** Create a single sentence description (ideally under 160 characters).
+2.  **Keywords:** Provide a list of 5 to 10 relevant keywords.
+
+Return the result as JSON with a "description" string and a "keywords" array of strings.
+"""
+# Structured output schema the model's JSON response must follow.
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "description": {"type": "STRING"},
+        "keywords": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["description", "keywords"],
+}
+# Maximum number of content characters sent to the model (roughly 3k tokens).
+MAX_CHARS = 12000
+# Share of MAX_CHARS taken from the start of long content; the rest comes from the end.
+HEAD_FRACTION = 0.75
+# Request-body service tier for each --tier choice sent as a regular request.
+# "batch" is handled separately through the Batch API.
+SERVICE_TIERS = {
+    "standard": None,
+    "flex": "FLEX",
+}
+TIER_CHOICES = [*SERVICE_TIERS, "batch"]
+# Maps each processed file to the hash of its main content at the last successful write.
+MANIFEST_PATH = ".fm-manifest.json"
+# HTTP status codes for rate limiting and transient server errors worth retrying.
+RETRYABLE_STATUS_CODES = {429, 500, 503, 504}
+DEFAULT_CONCURRENCY = 20  # Maximum number of in-flight generation requests
+BATCH_POLL_INTERVAL = 30  # Seconds between batch job status checks
+BATCH_COMPLETED_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+class FrontMatterGenerationError(Exception):
     """
-    Generates a description and keywords for the given content using the Gemini API.
+    Raised when front matter cannot be generated for a file.
+    """
+
+def get_api_key():
+    """
+    Returns the Gemini API key from the environment, exiting if it is not set.
     """
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         print("Error: GEMINI_API_KEY environment variable not set.", file=sys.stderr)
         sys.exit(1)
+    return api_key
 
-    client = genai.Client(api_key=api_key)
-
-    # Add the "models/" prefix if it's not already there.
+def resolve_model_name(model_name):
+    """
+    Adds the "models/" prefix to the model name if it's not already there.
+    """
     if not model_name.startswith("models/"):
         model_name = f"models/{model_name}"
+    return model_name
 
-    prompt = f"""\
-Analyze the following Markdown formatted page content and generate a concise, SEO-friendly description and a list of relevant keywords.
+def cache_key(prompt, model_name):
+    """
+    Returns the response cache key for the given prompt and resolved model name.
 
-**Markdown Content:**
-```markdown
-{content}
-```
+    The key covers the full prompt and the response schema, so changing the
+    template, truncation limits or schema invalidates cached responses.
+    """
+    schema = json.dumps(RESPONSE_SCHEMA, sort_keys=True)
+    return hashlib.sha256("\0".join((model_name, schema, prompt)).encode("utf-8")).hexdigest()
 
-**Instructions:**
-1.  **Description:** Create a single sentence description (ideally under 160 characters).
-2.  **Keywords:** Provide a comma-separated list of 5 to 10 relevant keywords.
+def get_cached_response(key):
+    """
+    Returns the cached response for the key, ignoring entries that don't parse.
+    """
+    cached_text = fm_cache.get(key)
+    if cached_text is None or not is_valid_output(cached_text):
+        return None
+    return cached_text
 
-**Output Format:**
-Return ONLY the description and keywords in the following format, with each key on a new line:
-description: [Your generated description]
-keywords: [keyword1, keyword2, keyword3]
-"""
+def cache_response(key, generated_text):
+    """
+    Caches a response, but only if it parses, so bad output is never replayed.
+
+    Cache write failures only print a warning, since the response itself is fine.
+    """
+    if not is_valid_output(generated_text):
+        return
+    try:
+        fm_cache.put(key, generated_text)
+    except OSError as e:
+        print(f"Warning: Could not write response to the cache: {e}", file=sys.stderr)
+
+def truncate_content(content):
+    """
+    Shortens long content to MAX_CHARS, keeping its introduction and conclusion.
+    """
+    if len(content) <= MAX_CHARS:
+        return content
+    head_chars = int(MAX_CHARS * HEAD_FRACTION)
+    tail_chars = MAX_CHARS - head_chars
+    return f"{content[:head_chars]}\n...\n{content[-tail_chars:]}"
+
+def generation_config(tier):
+    """
+    Returns the request config for JSON output on the given service tier.
+    """
+    http_options = None
+    service_tier = SERVICE_TIERS.get(tier)
+    if service_tier is not None:
+        http_options = types.HttpOptions(extra_body={"serviceTier": service_tier})
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=RESPONSE_SCHEMA,
+        http_options=http_options,
+    )
+
+def server_retry_delay(error):
+    """
+    Returns the retry delay in seconds suggested by an API error, or None.
+
+    Rate-limit errors carry it as a google.rpc.RetryInfo detail such as
+    {"retryDelay": "30s"}.
+    """
+    details = error.details if isinstance(error.details, dict) else {}
+    details = details.get("error", details)
+    for detail in details.get("details") or []:
+        if not isinstance(detail, dict) or not detail.get("@type", "").endswith("RetryInfo"):
+            continue
+        try:
+            return float(str(detail.get("retryDelay", "")).rstrip("s"))
+        except ValueError:
+            return None
+    return None
+
+def next_retry_delay(error, backoff_delay):
+    """
+    Returns the jittered delay before retrying a transient API error, and the
+    backoff delay to use for the retry after that.
+    """
+    retry_delay = server_retry_delay(error)
+
+    if retry_delay is not None:
+        # Spread concurrent retries by +/-10% so they don't all arrive together
+        delay = retry_delay * random.uniform(0.9, 1.1)
+        print(f"API error occurred. Retrying in {delay:.2f} seconds as suggested by the API.", file=sys.stderr)
+        return delay, backoff_delay
+
+    # Fallback to exponential backoff with full jitter if 'retry_delay' is not present
+    delay = random.uniform(0, backoff_delay)
+    print(f"API error: {error}. Retrying in {delay:.2f} seconds...", file=sys.stderr)
+    return delay, min(backoff_delay * 2, 60)  # Double the delay, capped at 60 seconds
+
+def call_with_retries(call, *args, **kwargs):
+    """
+    Calls a synchronous SDK method, retrying transient API errors with backoff.
+    """
+    backoff_delay = 1  # Initial delay in seconds for exponential backoff
+    while True:
+        try:
+            return call(*args, **kwargs)
+        except genai_errors.APIError as e:
+            if e.code not in RETRYABLE_STATUS_CODES:
+                raise
+            delay, backoff_delay = next_retry_delay(e, backoff_delay)
+            time.sleep(delay)
+
+def build_prompt(content):
+    """
+    Builds the generation prompt for the given Markdown content.
+    """
+    return _PROMPT_HEAD + truncate_content(content) + _PROMPT_TAIL
+
+async def generate_front_matter(
+    client, content, model_name, semaphore, config, use_cache=True
+):
+    """
+    Generates a description and keywords for the given content using the Gemini API.
+
+    The client, resolved model name and request config are set up once by the
+    caller and shared across calls. The semaphore bounds how many requests are
+    in flight at once across all files. Valid responses are cached on disk by
+    content hash unless use_cache is False.
+    """
+    prompt = build_prompt(content)
+    key = cache_key(prompt, model_name)
+    if use_cache:
+        cached_text = get_cached_response(key)
+        if cached_text is not None:
+            return cached_text
 
     backoff_delay = 1  # Initial delay in seconds for exponential backoff
 
     while True:
         try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-            )
-            return response.text
-        except (
-            google_exceptions.ResourceExhausted,
-            google_exceptions.ServiceUnavailable,
-            google_exceptions.InternalServerError,
-            google_exceptions.DeadlineExceeded,
-        ) as e:
-            # Check if the exception has a 'retry_delay' attribute from the user's feedback
-            retry_delay = getattr(e, 'retry_delay', None)
-
-            if retry_delay is not None:
-                print(f"API error occurred. Retrying in {retry_delay:.2f} seconds as suggested by the API.", file=sys.stderr)
-                time.sleep(retry_delay)
-            else:
-                # Fallback to exponential backoff if 'retry_delay' is not present
-                print(f"API error: {e}. Retrying in {backoff_delay} seconds...", file=sys.stderr)
-                time.sleep(backoff_delay)
-                backoff_delay = min(backoff_delay * 2, 60)  # Double the delay, capped at 60 seconds
+            async with semaphore:
+                response = await client.aio.models.generate_content(
+                    model=model_name,
+                    contents=prompt,
+                    config=config,
+                )
+            break
+        except genai_errors.APIError as e:
+            if e.code not in RETRYABLE_STATUS_CODES:
+                # Handle non-retryable errors, such as invalid model names
+                user_model_name = model_name.replace("models/", "")
+                raise FrontMatterGenerationError(
+                    f"An unrecoverable error occurred with model '{user_model_name}': {e}"
+                ) from e
+
+            delay, backoff_delay = next_retry_delay(e, backoff_delay)
+            await asyncio.sleep(delay)
         except Exception as e:
             # Handle non-retryable errors, such as invalid model names
             user_model_name = model_name.replace("models/", "")
-            print(f"An unrecoverable error occurred with model '{user_model_name}': {e}", file=sys.stderr)
-
-            # Attempt to list available models to help the user
-            try:
-                print("\nAttempting to list available models...", file=sys.stderr)
-                available_models = [
-                    m.name for m in client.models.list() if "generateContent" in m.supported_generation_methods
-                ]
-                if available_models:
-                    print("\nPlease choose from one of the following available models:", file=sys.stderr)
-                    for model in sorted(available_models):
-                        print(f"  - {model.replace('models/', '')}", file=sys.stderr)
-                else:
-                    print("Could not find any available models that support content generation.", file=sys.stderr)
-            except Exception as list_e:
-                print(f"\nAdditionally, failed to retrieve the list of available models: {list_e}", file=sys.stderr)
-                print("Please check your API key and network connection.", file=sys.stderr)
-
-            sys.exit(1)
-
-def process_file(filepath, model_name, ignore_existing):
-    """
-    Processes a single markdown file to add or update its front matter.
+            raise FrontMatterGenerationError(
+                f"An unrecoverable error occurred with model '{user_model_name}': {e}"
+            ) from e
+
+    if use_cache:
+        cache_response(key, response.text)
+    return response.text
+
+@functools.lru_cache(maxsize=1)
+def _available_models(client):
+    """
+    Returns the sorted names of models that support content generation.
+
+    Cached so repeated failures across a batch of files only list models once.
+    """
+    return tuple(sorted(
+        m.name.replace("models/", "")
+        for m in client.models.list()
+        if "generateContent" in (m.supported_actions or [])
+    ))
+
+def print_available_models(client):
+    """
+    Prints the models that support content generation to help the user pick one.
+    """
+    try:
+        print("\nAttempting to list available models...", file=sys.stderr)
+        available_models = _available_models(client)
+        if available_models:
+            print("\nPlease choose from one of the following available models:", file=sys.stderr)
+            for model in available_models:
+                print(f"  - {model}", file=sys.stderr)
+        else:
+            print("Could not find any available models that support content generation.", file=sys.stderr)
+    except Exception as list_e:
+        print(f"\nAdditionally, failed to retrieve the list of available models: {list_e}", file=sys.stderr)
+        print("Please check your API key and network connection.", file=sys.stderr)
+
+def batch_generate(client, prompts, model_name):
+    """
+    Generates text for many prompts with a single Gemini Batch API job.
+
+    Takes a dict mapping keys to prompts and returns a dict mapping the same
+    keys to the generated text. Keys whose request failed are omitted. Raises
+    FrontMatterGenerationError if the job cannot be run.
+    """
+    try:
+        return _run_batch_job(client, prompts, model_name)
+    except genai_errors.APIError as e:
+        user_model_name = model_name.replace("models/", "")
+        raise FrontMatterGenerationError(
+            f"Batch job failed with model '{user_model_name}': {e}"
+        ) from e
+
+def _run_batch_job(client, prompts, model_name):
+    """
+    Uploads the requests, runs the batch job to completion and collects the results.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", suffix=".jsonl", delete=False
+    ) as f:
+        for key, prompt in prompts.items():
+            request = {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generation_config": {
+                    "response_mime_type": "application/json",
+                    "response_schema": RESPONSE_SCHEMA,
+                },
+            }
+            f.write(json.dumps({"key": key, "request": request}) + "\n")
+        requests_path = f.name
+
+    try:
+        uploaded = client.files.upload(
+            file=requests_path,
+            config=types.UploadFileConfig(
+                display_name="docusaurus-frontmatter-requests", mime_type="jsonl"
+            ),
+        )
+    finally:
+        os.remove(requests_path)
+
+    batch_job = client.batches.create(
+        model=model_name,
+        src=uploaded.name,
+        config={"display_name": "docusaurus-frontmatter"},
+    )
+    print(
+        f"Submitted batch job '{batch_job.name}' with {len(prompts)} request(s). "
+        "If this run is interrupted, the job keeps running and can be looked up by this name."
+    )
+
+    try:
+        return _collect_batch_results(client, batch_job)
+    except genai_errors.APIError as e:
+        raise FrontMatterGenerationError(
+            f"Lost track of batch job '{batch_job.name}', which may still be running: {e}"
+        ) from e
+
+def _collect_batch_results(client, batch_job):
+    """
+    Polls a submitted batch job until it completes and returns its results by key.
+    """
+    while batch_job.state.name not in BATCH_COMPLETED_STATES:
+        print(f"Batch job state: {batch_job.state.name}. Checking again in {BATCH_POLL_INTERVAL} seconds...")
+        time.sleep(BATCH_POLL_INTERVAL)
+        batch_job = call_with_retries(client.batches.get, name=batch_job.name)
+
+    if batch_job.state.name != "JOB_STATE_SUCCEEDED":
+        raise FrontMatterGenerationError(
+            f"Batch job '{batch_job.name}' finished with state {batch_job.state.name}: {batch_job.error}"
+        )
+
+    results = {}
+    result_content = call_with_retries(client.files.download, file=batch_job.dest.file_name)
+    for line in result_content.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        try:
+            result = json.loads(line)
+            key = result.get("key")
+        except (ValueError, AttributeError) as e:
+            print(f"Error: Skipping malformed line in batch results: {e}", file=sys.stderr)
+            continue
+        if "error" in result:
+            print(f"Error: Batch request for '{key}' failed: {result['error']}", file=sys.stderr)
+            continue
+        try:
+            parts = result["response"]["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError):
+            print(f"Error: Batch response for '{key}' contained no content.", file=sys.stderr)
+            continue
+        results[key] = "".join(part.get("text", "") for part in parts)
+
+    return results
+
+def split_front_matter(file_content):
+    """
+    Splits file content into its front matter string and main content.
+
+    Returns a (front_matter_str, main_content) tuple, where front_matter_str is
+    None if the content has no front matter block.
+    """
+    if not file_content.startswith("---"):
+        return None, file_content
+
+    # Fast path for the common "---\n...\n---\n" layout using plain string search.
+    # Whitespace right after the opening fence is left to the regex, which
+    # folds leading blank lines into the opening fence.
+    if file_content.startswith("---\n") and not file_content[4:5].isspace():
+        end = file_content.find("\n---\n", 4)
+        # An earlier fence with trailing whitespace closes the block instead.
+        if end != -1 and not _LOOSE_FENCE_RE.search(file_content, 3, end + 1):
+            body_start = _BLANK_LINES_RE.match(file_content, end + 5).end()
+            return file_content[4:end], file_content[body_start:]
+
+    match = _FM_RE.match(file_content)
+    if match:
+        return match.group(1), match.group(2)
+    return None, file_content
+
+def read_markdown(filepath):
+    """
+    Reads a markdown file and splits it into its front matter string and main content.
+
+    The file is memory-mapped and decoded straight from the mapping, without
+    an intermediate bytes copy.
+    """
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            has_carriage_returns = mm.find(b"\r") != -1
+            file_content = str(mm, "utf-8")
+
+    if has_carriage_returns:
+        # Normalize line endings the same way text-mode reads do.
+        file_content = file_content.replace("\r\n", "\n").replace("\r", "\n")
+    return split_front_matter(file_content)
+
+def write_atomic(filepath, data):
+    """
+    Writes bytes to a file by replacing it with a fully written temporary file.
+
+    Readers never observe a partially written file, and an interrupted write
+    leaves the original untouched. Symlinks are followed, so the file they
+    point to is replaced rather than the link itself.
     """
+    filepath = os.path.realpath(filepath)
+    directory = os.path.dirname(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            file_content = f.read()
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+        # mkstemp creates the file as 0600; keep the original file's permissions,
+        # or use the default permissions for a new file.
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, tmp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def content_hash(main_content):
+    """
+    Returns the manifest hash of a file's main content.
+    """
+    return hashlib.sha256(main_content.encode("utf-8")).hexdigest()
+
+def manifest_key(filepath):
+    """
+    Returns the manifest key for a file, relative to the working directory.
+    """
+    return os.path.relpath(filepath)
+
+def load_manifest():
+    """
+    Loads the content-hash manifest, returning an empty one if it is missing or invalid.
+    """
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
     except FileNotFoundError:
-        print(f"Error: File not found at {filepath}", file=sys.stderr)
-        return  # Return instead of exiting
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable manifest {MANIFEST_PATH}: {e}", file=sys.stderr)
+        return {}
+    if not isinstance(manifest, dict):
+        print(f"Warning: Ignoring malformed manifest {MANIFEST_PATH}.", file=sys.stderr)
+        return {}
+    return manifest
+
+def save_manifest(manifest):
+    """
+    Atomically writes the content-hash manifest.
+    """
+    data = json.dumps(manifest, indent=2, sort_keys=True) + "\n"
+    write_atomic(MANIFEST_PATH, data.encode("utf-8"))
+
+def read_and_strip(filepath, ignore_existing, manifest=None, force=False):
+    """
+    Reads a markdown file and separates its front matter from the main content.
+
+    Files that already have a description are skipped if their content matches
+    the manifest (unless force is set), or if ignore_existing is set and the
+    manifest does not show the content as changed since the last run.
 
-    # Use regex to separate front matter from the main content
-    match = re.match(r'^---\s*\n(.*?)\n---\s*\n(.*)', file_content, re.DOTALL)
+    Returns a (front_matter_dict, main_content) tuple, or None if the file
+    should not be processed.
+    """
+    try:
+        front_matter_str, main_content = read_markdown(filepath)
+    except FileNotFoundError:
+        print(f"Error: File not found at {filepath}", file=sys.stderr)
+        return None
 
+    # Drop any leading blank lines, as rereading the written file would, so the
+    # manifest hash and cache key match what the next run reads back.
+    main_content = main_content[_BLANK_LINES_RE.match(main_content).end():]
     front_matter_dict = {}
-    main_content = file_content
 
-    if match:
-        front_matter_str = match.group(1)
-        main_content = match.group(2)
+    if front_matter_str is not None:
         try:
-            front_matter_dict = yaml.safe_load(front_matter_str) or {}
+            front_matter_dict = yaml.load(front_matter_str, Loader=SafeLoader) or {}
         except yaml.YAMLError as e:
             print(f"Error parsing existing front matter in {filepath}: {e}", file=sys.stderr)
-            return  # Return on parsing error
+            return None
+
+        if front_matter_dict.get("description"):
+            recorded_hash = manifest.get(manifest_key(filepath)) if manifest else None
+            changed = recorded_hash is not None and recorded_hash != content_hash(main_content)
+
+            if recorded_hash is not None and not changed and not force:
+                print(f"Skipping '{filepath}' because its content is unchanged since the last run.")
+                return None
 
-        if ignore_existing and front_matter_dict.get("description"):
-            print(f"Skipping '{filepath}' because it already has a description and --ignore-existing is set.")
-            return  # Skip the file by returning
+            if ignore_existing and not changed:
+                print(f"Skipping '{filepath}' because it already has a description and --ignore-existing is set.")
+                return None
+
+            if ignore_existing:
+                print(f"File '{filepath}' has changed since the last run, so --ignore-existing does not apply.")
 
         print(f"File '{filepath}' has existing front matter. It will be updated.")
     else:
         print(f"File '{filepath}' has no front matter. A new one will be created.")
 
-    generated_text = generate_front_matter(main_content, model_name)
-
-    try:
-        lines = generated_text.strip().split('\n')
-        description = ""
-        keywords_str = ""
-        for line in lines:
-            if line.lower().startswith("description:"):
-                description = line.split(":", 1)[1].strip()
-            elif line.lower().startswith("keywords:"):
-                keywords_str = line.split(":", 1)[1].strip()
+    return front_matter_dict, main_content
 
-        if not description or not keywords_str:
-            raise ValueError("Could not parse description or keywords from model output.")
+def parse_generated_text(generated_text):
+    """
+    Extracts the description and keyword list from the model's JSON output.
 
-        if keywords_str.startswith('[') and keywords_str.endswith(']'):
-            keywords_str = keywords_str[1:-1]
+    Raises ValueError if the output is missing, not valid JSON or lacks either field.
+    """
+    if not isinstance(generated_text, str) or not generated_text.strip():
+        raise ValueError("Model returned no text.")
+    data = json.loads(generated_text)
+    if not isinstance(data, dict):
+        raise ValueError("Model output is not a JSON object.")
+
+    description = data.get("description")
+    keywords = data.get("keywords")
+    if not isinstance(description, str) or not isinstance(keywords, list):
+        raise ValueError("Could not parse description or keywords from model output.")
+
+    description = description.strip()
+    keywords = [k.strip() for k in keywords if isinstance(k, str) and k.strip()]
+    if not description or not keywords:
+        raise ValueError("Model output has an empty description or keyword list.")
+    return description, keywords
+
+def is_valid_output(generated_text):
+    """
+    Returns whether the model output parses into a description and keywords.
+    """
+    if not generated_text:
+        return False
+    try:
+        parse_generated_text(generated_text)
+    except ValueError:
+        return False
+    return True
 
-        keywords = [k.strip().strip('"\'') for k in keywords_str.split(',')]
+def write_back(filepath, front_matter_dict, main_content, generated_text, manifest=None):
+    """
+    Parses the generated text and writes the updated front matter back to the file.
 
-    except (ValueError, IndexError) as e:
-        print(f"Error parsing generated text:\n---\n{generated_text}\n---\nError: {e}", file=sys.stderr)
-        return  # Return on parsing error
+    On success, records the file's content hash in the manifest if one is given.
+    Raises FrontMatterGenerationError if the generated text cannot be parsed or
+    the file cannot be written.
+    """
+    try:
+        description, keywords = parse_generated_text(generated_text)
+    except ValueError as e:
+        print(f"Error parsing generated text for {filepath}:\n---\n{generated_text}\n---\nError: {e}", file=sys.stderr)
+        raise FrontMatterGenerationError(f"Could not parse generated text: {e}") from e
 
     front_matter_dict['description'] = description
     front_matter_dict['keywords'] = keywords
 
-    new_front_matter_str = yaml.dump(front_matter_dict, default_flow_style=False, sort_keys=False)
-    new_file_content = f"---\n{new_front_matter_str}---\n\n{main_content}"
+    new_front_matter_str = yaml.dump(
+        front_matter_dict, Dumper=SafeDumper, default_flow_style=False, sort_keys=False
+    )
+    new_file_content = bytearray(b"---\n")
+    new_file_content += new_front_matter_str.encode("utf-8")
+    new_file_content += b"---\n\n"
+    new_file_content += main_content.encode("utf-8")
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(new_file_content)
+    try:
+        write_atomic(filepath, new_file_content)
+    except OSError as e:
+        raise FrontMatterGenerationError(f"Could not write updated file: {e}") from e
+    if manifest is not None:
+        manifest[manifest_key(filepath)] = content_hash(main_content)
 
     print(f"Successfully generated and updated front matter for {filepath}")
 
+def read_files(filepaths, ignore_existing, jobs=1, manifest=None, force=False):
+    """
+    Reads and strips several markdown files, using a process pool when jobs > 1.
+
+    See read_and_strip() for how ignore_existing, manifest and force select files.
+
+    Returns a dict mapping each file to be processed to its
+    (front_matter_dict, main_content) tuple, in input order.
+    """
+    worker = functools.partial(
+        read_and_strip, ignore_existing=ignore_existing, manifest=manifest, force=force
+    )
+    if jobs > 1 and len(filepaths) > 1:
+        with Pool(min(jobs, len(filepaths))) as pool:
+            stripped_files = pool.map(worker, filepaths)
+    else:
+        stripped_files = map(worker, filepaths)
+
+    return {
+        filepath: stripped
+        for filepath, stripped in zip(filepaths, stripped_files)
+        if stripped is not None
+    }
+
+async def process_file(
+    client,
+    filepath,
+    front_matter_dict,
+    main_content,
+    model_name,
+    semaphore,
+    config,
+    use_cache=True,
+    manifest=None,
+):
+    """
+    Generates and writes the front matter for a single, already-read markdown file.
+    """
+    generated_text = await generate_front_matter(
+        client, main_content, model_name, semaphore, config, use_cache
+    )
+    write_back(filepath, front_matter_dict, main_content, generated_text, manifest)
+
+def process_files_batch(client, pending, model_name, use_cache=True, manifest=None):
+    """
+    Processes several markdown files with a single Gemini Batch API job.
+
+    Takes the dict returned by read_files(). Files whose response is already
+    cached are written without being submitted. Returns a dict mapping each
+    file that could not be generated to its FrontMatterGenerationError.
+    """
+    errors = {}
+    results = {}
+    prompts = {}
+    for filepath, (_, main_content) in pending.items():
+        prompt = build_prompt(main_content)
+        cached_text = get_cached_response(cache_key(prompt, model_name)) if use_cache else None
+        if cached_text is not None:
+            results[filepath] = cached_text
+        else:
+            prompts[filepath] = prompt
+
+    if prompts:
+        try:
+            generated = batch_generate(client, prompts, model_name)
+        except FrontMatterGenerationError as e:
+            errors.update(dict.fromkeys(prompts, e))
+            generated = {}
+        if use_cache:
+            for filepath, generated_text in generated.items():
+                cache_response(cache_key(prompts[filepath], model_name), generated_text)
+        results.update(generated)
+
+    for filepath, (front_matter_dict, main_content) in pending.items():
+        if filepath in errors:
+            continue
+        generated_text = results.get(filepath)
+        if generated_text is None:
+            errors[filepath] = FrontMatterGenerationError("No generated text returned.")
+            continue
+        try:
+            write_back(filepath, front_matter_dict, main_content, generated_text, manifest)
+        except FrontMatterGenerationError as e:
+            errors[filepath] = e
+
+    return errors
+
+async def process_files_concurrently(
+    client, pending, model_name, concurrency, config, use_cache=True, manifest=None
+):
+    """
+    Processes several markdown files concurrently, one request per file.
+
+    Takes the dict returned by read_files(). Returns a dict mapping each file
+    that could not be generated to its FrontMatterGenerationError.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        process_file(
+            client,
+            filepath,
+            front_matter_dict,
+            main_content,
+            model_name,
+            semaphore,
+            config,
+            use_cache,
+            manifest,
+        )
+        for filepath, (front_matter_dict, main_content) in pending.items()
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    errors = {}
+    for filepath, result in zip(pending, results):
+        if isinstance(result, FrontMatterGenerationError):
+            errors[filepath] = result
+        elif isinstance(result, BaseException):
+            raise result
+    return errors
+
+def report_errors(client, errors):
+    """
+    Prints every file that failed, followed by the available models if any
+    failure came from the API, which usually means a bad model name.
+    """
+    print(f"\nFailed to generate front matter for {len(errors)} file(s):", file=sys.stderr)
+    for filepath, error in errors.items():
+        print(f"  - {filepath}: {error}", file=sys.stderr)
+    if any(isinstance(error.__cause__, genai_errors.APIError) for error in errors.values()):
+        print_available_models(client)
+
 
 def main():
     """
@@ -187,12 +786,80 @@ def main():
     parser.add_argument(
         "--ignore-existing",
         action="store_true",
-        help="Skip files that already have a description in their front matter.",
+        help=(
+            "Skip files that already have a description in their front matter, "
+            "unless their content changed since the last run."
+        ),
+    )
+    parser.add_argument(
+        "--tier",
+        choices=TIER_CHOICES,
+        default="standard",
+        help=(
+            "Service tier to run requests on: 'standard', 'flex' (discounted, higher latency), "
+            "or 'batch' (all files in a single Batch API job). (default: standard)"
+        ),
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum number of concurrent API requests. (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Always query the API instead of reusing responses cached in {fm_cache.CACHE_DIR}/.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"Process files even if their content is unchanged according to {MANIFEST_PATH}.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to read and parse files. (default: 1)",
     )
     args = parser.parse_args()
+    use_cache = not args.no_cache
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    manifest = load_manifest()
+    pending = read_files(
+        args.markdown_files, args.ignore_existing, args.jobs, manifest, args.force
+    )
+    if not pending:
+        return
+
+    # Create a single client so every request reuses the same HTTP connection pool.
+    client = genai.Client(api_key=get_api_key())
 
-    for filepath in args.markdown_files:
-        process_file(filepath, args.model, args.ignore_existing)
+    model_name = resolve_model_name(args.model)
+
+    # Save the manifest even if processing is interrupted, so files already
+    # rewritten in this run are not regenerated next time.
+    try:
+        if args.tier == "batch" and len(pending) > 1:
+            errors = process_files_batch(client, pending, model_name, use_cache, manifest)
+        else:
+            config = generation_config(args.tier)
+            errors = asyncio.run(
+                process_files_concurrently(
+                    client, pending, model_name, args.concurrency, config, use_cache, manifest
+                )
+            )
+    finally:
+        save_manifest(manifest)
+
+    if errors:
+        report_errors(client, errors)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
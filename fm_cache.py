@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+CACHE_DIR = ".fm-cache"
+
+def _path(key):
+    """
+    Returns the on-disk path for a cache key, sharded by its first two characters.
+    """
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.txt")
+
+def get(key):
+    """
+    Returns the cached value for the given key, or None if it is not cached.
+    """
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def put(key, value):
+    """
+    Stores a value under the given key, replacing any existing entry.
+    """
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent readers never see a partial entry.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise